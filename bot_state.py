@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import zlib
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+MAGIC = b'HWBS'
+VERSION = 2
+STORE_ERRORS = (OSError,) + ((redis.RedisError,) if redis else ())
+
+
+class FileStore:
+    """Снимок состояния в локальном файле.
+    Файл виден только процессам на той же машине: передача состояния
+    работает при перезапуске на месте, но не между разными dyno Heroku,
+    у каждого из которых своя файловая система
+    """
+
+    def __init__(self, path):
+        """Создание хранилища с путём к файлу."""
+        self.path = path
+
+    def read(self):
+        """Содержимое снимка или None, если его нет."""
+        try:
+            with open(self.path, 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, data):
+        """Атомарная запись снимка."""
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Удаление снимка."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __str__(self):
+        """Путь к файлу для сообщений в логе."""
+        return self.path
+
+
+class RedisStore:
+    """Снимок состояния в Redis под ключом key.
+    Redis доступен и старому, и новому процессу, поэтому состояние
+    передаётся и при перезапуске на другом dyno
+    """
+
+    def __init__(self, url, key):
+        """Подключение к Redis по url."""
+        if redis is None:
+            raise RuntimeError('Для REDIS_URL нужен установленный пакет redis')
+        self.client = redis.Redis.from_url(url)
+        self.key = key
+
+    def read(self):
+        """Содержимое снимка или None, если его нет."""
+        return self.client.get(self.key)
+
+    def write(self, data):
+        """Запись снимка."""
+        self.client.set(self.key, data)
+
+    def clear(self):
+        """Удаление снимка."""
+        self.client.delete(self.key)
+
+    def __str__(self):
+        """Ключ в Redis для сообщений в логе."""
+        return f'redis:{self.key}'
+
+
+def open_store(path, redis_url=None):
+    """Хранилище снимка: Redis, если задан redis_url, иначе файл path."""
+    if redis_url:
+        return RedisStore(redis_url, os.path.basename(path))
+    return FileStore(path)
+
+
+def encode_state(state):
+    """Снимок в компактном двоичном виде.
+    Формат: сигнатура, версия и сжатый zlib JSON-документ
+    """
+    data = json.dumps(state, ensure_ascii=False, separators=(',', ':'))
+    return MAGIC + bytes((VERSION,)) + zlib.compress(data.encode())
+
+
+def decode_state(data):
+    """Разбор содержимого снимка.
+    Снимки без сигнатуры читаются как JSON прежних версий бота
+    """
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError(f'Неизвестная версия состояния {data[len(MAGIC)]}')
+    return json.loads(zlib.decompress(data[len(MAGIC) + 1:]))
+
+
+def save_state(store, state):
+    """Сохранение состояния бота в хранилище."""
+    store.write(encode_state(state))
+
+
+def load_state(store):
+    """Загрузка сохранённого состояния.
+    Снимок не удаляется: это делает clear_state после успешного
+    запуска, чтобы при сбое запуска состояние не потерялось.
+    Возвращает пустой словарь, если состояния нет или оно повреждено
+    """
+    try:
+        data = store.read()
+        return decode_state(data) if data else {}
+    except STORE_ERRORS + (ValueError, IndexError, zlib.error) as error:
+        logging.error(f'Не удалось загрузить состояние бота: {error}')
+        return {}
+
+
+def clear_state(store):
+    """Удаление снимка, уже принятого новым процессом."""
+    try:
+        store.clear()
+    except STORE_ERRORS as error:
+        logging.error(f'Не удалось удалить состояние бота: {error}')
@@ -0,0 +1,74 @@
+import threading
+
+
+class Call:
+    """Выполняющийся вызов, результат которого ждут несколько потоков."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        """Создание незавершённого вызова."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных вызовов в один.
+    Пока вызов с ключом key выполняется, остальные вызовы с тем же
+    ключом не запускают function, а ждут и получают тот же результат
+    или то же исключение
+    """
+
+    def __init__(self):
+        """Создание пустого реестра выполняющихся вызовов."""
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.metrics = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key, function):
+        """Вызов function() с объединением по ключу key."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+                self.metrics['calls'] += 1
+            else:
+                self.metrics['coalesced'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+
+def memoize_calls(function):
+    """Обёртка, вызывающая function не больше раза для одних аргументов.
+    Повторные вызовы получают результат или исключение первого.
+    Кэш живёт, пока жива обёртка, поэтому её создают на один раунд опроса
+    """
+    results = {}
+
+    def call(*args):
+        if args not in results:
+            try:
+                results[args] = function(*args), None
+            except Exception as error:
+                results[args] = None, error
+        result, error = results[args]
+        if error is not None:
+            raise error
+        return result
+
+    return call
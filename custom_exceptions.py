@@ -7,4 +7,7 @@ class ResponseNot200(Exception):
 class ErrorSendMessage(Exception):
     """Ошибка отправки сообщения в Telegram"""
 
-    pass
+    def __init__(self, message, retry_after=None):
+        """retry_after - пауза в секундах, запрошенная Telegram."""
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -0,0 +1,135 @@
+import codecs
+import importlib
+import json
+import logging
+
+import requests
+
+FAST_DECODERS = ('orjson', 'ujson')
+WHITESPACE = ' \t\n\r'
+
+
+def load_decoder(name=None):
+    """Выбор функции декодирования JSON.
+    По умолчанию берётся самая быстрая из установленных библиотек,
+    при их отсутствии - стандартный json. Предупреждение пишется, только
+    если не установлен явно заданный декодер. Возвращает имя и функцию loads
+    """
+    for candidate in (name,) if name else FAST_DECODERS:
+        try:
+            return candidate, importlib.import_module(candidate).loads
+        except ImportError:
+            if name:
+                logging.warning(f'Декодер JSON {candidate} не установлен,'
+                                f' используется json')
+    return 'json', json.loads
+
+
+def decode_response(response, loads=json.loads):
+    """Декодирование тела ответа выбранной функцией loads.
+    Стандартный декодер и ответы, не являющиеся requests.Response,
+    разбираются собственным методом json() ответа
+    """
+    if loads is json.loads or not isinstance(response, requests.Response):
+        return response.json()
+    return loads(response.content)
+
+
+class StreamedAnswer:
+    """Потоковый разбор ответа АПИ без загрузки документа целиком.
+    Итерация выдаёт работы из списка homeworks по одной, в памяти
+    держится только текущая работа. После завершения итерации
+    остальные поля ответа доступны в словаре fields
+    """
+
+    def __init__(self, chunks):
+        """Создание разборщика над итератором байтовых фрагментов."""
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.fields = {}
+        self.homeworks_found = False
+
+    def __iter__(self):
+        """Разбор объекта верхнего уровня с выдачей работ."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(':')
+            if key == 'homeworks' and self.peek() == '[':
+                self.homeworks_found = True
+                yield from self.iter_array()
+            else:
+                self.fields[key] = self.decode_value()
+            if self.expect(',}') == '}':
+                return
+
+    def iter_array(self):
+        """Поэлементный разбор массива."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.expect(',]') == ']':
+                return
+
+    def read(self):
+        """Дочитывание фрагмента с отбрасыванием разобранной части буфера.
+        Возвращает False, если поток закончился
+        """
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        self.buffer = (self.buffer[self.pos:]
+                       + self.text_decoder.decode(chunk))
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Следующий значимый символ или пустая строка в конце потока."""
+        while True:
+            while (self.pos < len(self.buffer)
+                   and self.buffer[self.pos] in WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read():
+                return ''
+
+    def expect(self, chars):
+        """Чтение одного из ожидаемых символов-разделителей."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f'Ожидался один из символов {chars!r},'
+                             f' получен {char!r}')
+        self.pos += 1
+        return char
+
+    def decode_value(self):
+        """Разбор JSON-значения с текущей позиции.
+        Значение принимается, только если за ним в буфере что-то есть:
+        иначе число, разрезанное границей фрагмента, разобралось бы частично
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(
+                    self.buffer, self.pos
+                )
+            except ValueError:
+                end = None
+            if end is not None and end < len(self.buffer):
+                self.pos = end
+                return value
+            if not self.read():
+                if end is None:
+                    raise ValueError('Оборванный JSON в ответе АПИ')
+                self.pos = end
+                return value
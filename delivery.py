@@ -0,0 +1,461 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import chain
+
+from custom_exceptions import ErrorSendMessage
+
+
+PRIORITY_VERDICT, PRIORITY_REVIEWING, PRIORITY_ERROR = range(3)
+PRIORITIES = (PRIORITY_VERDICT, PRIORITY_REVIEWING, PRIORITY_ERROR)
+PRIORITY_NAMES = ('verdict', 'reviewing', 'error')
+
+
+class MessageBatcher:
+    """Накопление сообщений по чатам и отправка их одним сообщением.
+    Сообщения чата копятся с первого добавленного в течение окна
+    window секунд, затем уходят одним сообщением через
+    send(chat_id, text, priority), где priority - класс первого сообщения.
+    Внутри пачки сообщения упорядочены по классам: вердикты, взятие
+    на проверку, ошибки. Под нагрузкой и во время паузы, запрошенной
+    Telegram через throttle, низшие классы сбрасываются
+    """
+
+    def __init__(self, send, window=0, max_length=4096, max_pending=100,
+                 shed_threshold=None):
+        """Создание накопителя с функцией отправки и окном в секундах."""
+        self.send = send
+        self.window = window
+        self.max_length = max_length
+        self.max_pending = max_pending
+        self.shed_threshold = shed_threshold or max_pending // 2
+        self.shed_counts = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.throttled_until = 0.0
+        self.pending = {}
+        self.opened = {}
+
+    def add(self, chat_id, message, priority=PRIORITY_VERDICT):
+        """Добавление сообщения в пачку чата с учётом класса."""
+        if chat_id not in self.pending:
+            self.pending[chat_id] = tuple(deque() for _ in PRIORITIES)
+            self.opened[chat_id] = time.monotonic()
+        queues = self.pending[chat_id]
+        queues[priority].append(message)
+        if self.throttled() or self.depth() > self.shed_threshold:
+            self.shed(queues)
+
+    def depth(self):
+        """Общее число сообщений в очередях всех чатов."""
+        return sum(
+            len(messages)
+            for queues in list(self.pending.values()) for messages in queues
+        )
+
+    def throttled(self):
+        """Telegram попросил подождать с отправкой."""
+        return time.monotonic() < self.throttled_until
+
+    def throttle(self, seconds):
+        """Пауза в отправке пачек на seconds секунд."""
+        self.throttled_until = max(self.throttled_until,
+                                   time.monotonic() + seconds)
+
+    def shed(self, queues):
+        """Сброс сообщений низших классов под нагрузкой.
+        Сначала очереди низших классов схлопываются до последнего
+        сообщения, затем при превышении max_pending удаляются старейшие
+        сообщения низшего непустого класса
+        """
+        for priority in reversed(PRIORITIES[1:]):
+            self.drop(queues, priority, len(queues[priority]) - 1)
+        for priority in reversed(PRIORITIES):
+            excess = sum(map(len, queues)) - self.max_pending
+            if excess <= 0:
+                break
+            self.drop(queues, priority, excess)
+
+    def drop(self, queues, priority, count):
+        """Удаление count старейших сообщений класса с учётом в счётчиках."""
+        count = min(count, len(queues[priority]))
+        if count <= 0:
+            return
+        for _ in range(count):
+            queues[priority].popleft()
+        name = PRIORITY_NAMES[priority]
+        self.shed_counts[name] += count
+        logging.warning(f'Сброшено сообщений класса {name}: {count},'
+                        f' всего {self.shed_counts[name]}')
+
+    def flush(self, force=False):
+        """Отправка пачек, у которых истекло окно накопления.
+        Возвращает число отправленных сообщений. При ошибке отправки
+        пачка остаётся в очереди до следующего вызова
+        """
+        if self.throttled():
+            return 0
+        now = time.monotonic()
+        sent = 0
+        for chat_id in list(self.pending):
+            if not force and now - self.opened[chat_id] < self.window:
+                continue
+            queues = self.pending[chat_id]
+            while any(queues):
+                text, count = self.combine(list(chain(*queues)))
+                priority = next(priority for priority in PRIORITIES
+                                if queues[priority])
+                self.send_batch(chat_id, text, priority)
+                self.take(queues, count)
+                sent += 1
+            del self.pending[chat_id], self.opened[chat_id]
+        return sent
+
+    def send_batch(self, chat_id, text, priority):
+        """Отправка пачки с запоминанием паузы, запрошенной Telegram."""
+        try:
+            self.send(chat_id, text, priority)
+        except ErrorSendMessage as error:
+            if error.retry_after:
+                self.throttle(error.retry_after)
+            raise
+
+    def combine(self, messages):
+        """Склейка сообщений в текст не длиннее max_length.
+        Возвращает текст и число вошедших в него сообщений
+        """
+        text, count = messages[0][:self.max_length], 1
+        for message in messages[1:]:
+            candidate = f'{text}\n\n{message}'
+            if len(candidate) > self.max_length:
+                break
+            text, count = candidate, count + 1
+        return text, count
+
+    @staticmethod
+    def take(queues, count):
+        """Удаление из очередей count первых по приоритету сообщений."""
+        for messages in queues:
+            while messages and count:
+                messages.popleft()
+                count -= 1
+
+    def compact(self):
+        """Схлопывание очередей низших классов во всех чатах."""
+        for queues in self.pending.values():
+            self.shed(queues)
+
+
+class LiveStatusCards:
+    """Живая карточка статуса: одно закреплённое сообщение на чат.
+    Карточка редактируется через editMessageText вместо отправки новых.
+    Id отправленной карточки хранится, пока Telegram не ответит,
+    что сообщения для редактирования больше нет
+    """
+
+    NOT_MODIFIED = 'message is not modified'
+    NOT_FOUND = 'message to edit not found'
+
+    def __init__(self, bot, message_ids=None):
+        """Создание карточек с уже известными id сообщений по чатам."""
+        self.bot = bot
+        self.message_ids = {
+            str(chat_id): message_id
+            for chat_id, message_id in (message_ids or {}).items()
+        }
+        self.texts = {}
+
+    def update(self, chat_id, text):
+        """Показ текста в карточке чата, создание карточки при отсутствии."""
+        key = str(chat_id)
+        if self.texts.get(key) == text:
+            return
+        if key in self.message_ids and not self.edit(chat_id, text):
+            del self.message_ids[key]
+        if key not in self.message_ids:
+            self.create(chat_id, text)
+        self.texts[key] = text
+
+    def edit(self, chat_id, text):
+        """Редактирование карточки.
+        Возвращает False, если сообщение карточки удалено из чата
+        """
+        message_id = self.message_ids[str(chat_id)]
+        try:
+            self.bot.edit_message_text(
+                text, chat_id=chat_id, message_id=message_id
+            )
+        except Exception as error:
+            if self.NOT_MODIFIED in str(error).lower():
+                return True
+            if self.NOT_FOUND in str(error).lower():
+                logging.warning(f'Карточка статуса удалена из чата {chat_id},'
+                                f' будет создана новая')
+                return False
+            raise ErrorSendMessage(
+                f'Ошибка обновления карточки статуса >> {error}',
+                retry_after=getattr(error, 'retry_after', None)
+            )
+        logging.info(f'Обновлена карточка статуса: {text}')
+        return True
+
+    def create(self, chat_id, text):
+        """Отправка и закрепление новой карточки.
+        Ошибка закрепления только логируется: карточка уже отправлена,
+        и повтор создал бы в чате её копию
+        """
+        try:
+            message = self.bot.send_message(chat_id, text)
+        except Exception as error:
+            raise ErrorSendMessage(
+                f'Ошибка отправки карточки статуса >> {error}',
+                retry_after=getattr(error, 'retry_after', None)
+            )
+        self.message_ids[str(chat_id)] = message.message_id
+        logging.info(f'Создана карточка статуса: {text}')
+        try:
+            self.bot.pin_chat_message(
+                chat_id, message.message_id, disable_notification=True
+            )
+        except Exception as error:
+            logging.warning(f'Не удалось закрепить карточку статуса'
+                            f' в чате {chat_id}: {error}')
+
+
+class SinkWorker:
+    """Доставка сообщений в один приёмник.
+    Очередь приёмника ограничена и разделена по классам сообщений:
+    при переполнении вытесняется старейшее сообщение низшего класса,
+    а сообщение, которому не уступает ни один класс, сбрасывается само.
+    У каждого приёмника свой поток доставки, поэтому медленный приёмник
+    не задерживает остальные, а сообщения уходят по порядку. Повтор
+    не занимает поток: сообщение возвращается в начало очереди,
+    а доставка возобновляется вызовом schedule после паузы.
+    send(message) выбрасывает ErrorSendMessage при ошибке отправки
+    """
+
+    def __init__(self, name, send, executor=None, max_queue=100,
+                 max_attempts=3, backoff=1.0, max_backoff=60.0,
+                 on_sent=None, on_throttled=None, tracer=None):
+        """Создание исполнителя с функцией отправки и политикой повторов."""
+        self.name = name
+        self.send = send
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            1, thread_name_prefix=f'sink-{name}'
+        )
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.on_sent = on_sent
+        self.on_throttled = on_throttled
+        self.tracer = tracer
+        self.queues = tuple(deque() for _ in PRIORITIES)
+        self.metrics = {'sent': 0, 'failed': 0, 'retries': 0, 'dropped': 0}
+        self.shed_counts = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.active = False
+        self.not_before = 0.0
+        self.stopping = threading.Event()
+        self.unsent = []
+        self.in_flight = None
+
+    def put(self, message, priority=PRIORITY_VERDICT):
+        """Постановка сообщения в очередь без ожидания.
+        Вместе с сообщением запоминается текущий отрезок трассировки,
+        чтобы отправка попала в ту же итерацию
+        """
+        parent = self.tracer.current() if self.tracer else None
+        with self.lock:
+            if self.queued() >= self.max_queue and not self.evict(priority):
+                self.count_shed(priority)
+                return
+            self.queues[priority].append(
+                (message, parent, 0, time.monotonic())
+            )
+        self.schedule()
+
+    def queued(self):
+        """Число сообщений в очереди."""
+        return sum(map(len, self.queues))
+
+    def oldest_age(self):
+        """Сколько секунд ждёт самое старое недоставленное сообщение.
+        Учитывается и сообщение, которое отправляется сейчас,
+        поэтому зависшая отправка видна по росту этого значения
+        """
+        with self.lock:
+            queued_at = [entry[-1] for entry in chain(*self.queues)]
+            if self.in_flight is not None:
+                queued_at.append(self.in_flight)
+        if not queued_at:
+            return 0.0
+        return time.monotonic() - min(queued_at)
+
+    def evict(self, priority):
+        """Вытеснение старейшего сообщения низшего класса не выше priority.
+        Возвращает False, если вытеснять некого
+        """
+        for victim in reversed(PRIORITIES[priority:]):
+            if self.queues[victim]:
+                self.queues[victim].popleft()
+                self.count_shed(victim)
+                return True
+        return False
+
+    def count_shed(self, priority):
+        """Учёт сброшенного при переполнении сообщения класса priority."""
+        name = PRIORITY_NAMES[priority]
+        self.shed_counts[name] += 1
+        self.metrics['dropped'] += 1
+        logging.warning(f'Приёмник {self.name}: очередь полна, сброшено'
+                        f' сообщение класса {name},'
+                        f' всего {self.shed_counts[name]}')
+
+    def schedule(self):
+        """Передача доставки в пул, если есть что отправлять."""
+        with self.lock:
+            if self.active or not self.ready():
+                return
+            self.active = True
+        self.executor.submit(self.drain)
+
+    def ready(self):
+        """Очередь не пуста и пауза перед повтором истекла."""
+        return self.queued() > 0 and (
+            self.stopping.is_set() or time.monotonic() >= self.not_before
+        )
+
+    def drain(self):
+        """Задача пула: отправка очереди по классам до паузы или конца."""
+        while True:
+            with self.lock:
+                if not self.ready():
+                    self.active = False
+                    self.idle.notify_all()
+                    return
+                priority = next(priority for priority in PRIORITIES
+                                if self.queues[priority])
+                entry = self.queues[priority].popleft()
+                self.in_flight = entry[-1]
+            try:
+                self.deliver(priority, *entry)
+            finally:
+                self.in_flight = None
+
+    def deliver(self, priority, message, parent, attempts, queued_at):
+        """Одна попытка отправки.
+        При ошибке сообщение возвращается в начало очереди с паузой:
+        экспоненциальной или запрошенной Telegram через retry_after,
+        о которой сообщается on_throttled. Во время остановки повторов нет:
+        сообщение откладывается в unsent
+        """
+        context = self.tracer.attach(parent) if self.tracer else nullcontext()
+        try:
+            with context:
+                self.send(message)
+        except ErrorSendMessage as error:
+            self.retry(priority, (message, parent, attempts + 1, queued_at),
+                       error)
+        else:
+            self.metrics['sent'] += 1
+            if self.on_sent is not None:
+                self.on_sent()
+
+    def retry(self, priority, entry, error):
+        """Возврат неотправленного сообщения в очередь или отказ от него."""
+        message, _, attempts, _ = entry
+        with self.lock:
+            if self.stopping.is_set():
+                self.unsent.append([priority, message])
+                return
+            if attempts >= self.max_attempts:
+                self.metrics['failed'] += 1
+                logging.error(f'Приёмник {self.name}: сообщение не'
+                              f' доставлено за {attempts} попыток: {error}')
+                return
+            self.metrics['retries'] += 1
+            self.not_before = time.monotonic() + (error.retry_after or min(
+                self.backoff * 2 ** (attempts - 1), self.max_backoff
+            ))
+            self.queues[priority].appendleft(entry)
+        if error.retry_after and self.on_throttled is not None:
+            self.on_throttled(error.retry_after)
+
+    def finish(self, timeout):
+        """Доставка оставшейся очереди без повторов за timeout секунд.
+        Поток доставки после этого завершается. Возвращает пары
+        [класс, сообщение], которые не успели или не смогли уйти
+        """
+        self.stopping.set()
+        self.schedule()
+        with self.lock:
+            self.idle.wait_for(lambda: not self.active, timeout)
+            pending = self.unsent + [
+                [priority, message]
+                for priority in PRIORITIES
+                for message, *_ in self.queues[priority]
+            ]
+            self.unsent = []
+            for messages in self.queues:
+                messages.clear()
+        if self.own_executor:
+            self.executor.shutdown(wait=False)
+        return pending
+
+    def snapshot(self):
+        """Метрики приёмника вместе с текущей длиной очереди."""
+        with self.lock:
+            return {**self.metrics, 'queued': self.queued(),
+                    'shed': dict(self.shed_counts)}
+
+
+class FanOut:
+    """Рассылка каждого сообщения во все приёмники."""
+
+    def __init__(self, workers):
+        """Создание рассылки по списку SinkWorker."""
+        self.workers = workers
+
+    def publish(self, chat_id, message, priority=PRIORITY_VERDICT):
+        """Передача сообщения всем приёмникам, chat_id - ключ пачки."""
+        for worker in self.workers:
+            worker.put(message, priority)
+
+    def oldest_age(self):
+        """Возраст самого старого недоставленного сообщения приёмников."""
+        return max((worker.oldest_age() for worker in self.workers),
+                   default=0.0)
+
+    def pump(self):
+        """Возобновление доставки у приёмников, чья пауза истекла."""
+        for worker in self.workers:
+            worker.schedule()
+
+    def restore(self, pending):
+        """Возврат в очереди сообщений, сохранённых прошлым процессом."""
+        for worker in self.workers:
+            for priority, message in pending.get(worker.name, ()):
+                worker.put(message, priority)
+
+    def stop(self, timeout):
+        """Остановка всех приёмников с общим сроком timeout секунд.
+        Возвращает недоставленные сообщения по именам приёмников
+        """
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker.stopping.set()
+            worker.schedule()
+        pending = {}
+        for worker in self.workers:
+            unsent = worker.finish(max(0, deadline - time.monotonic()))
+            if unsent:
+                pending[worker.name] = unsent
+        return pending
+
+    def metrics(self):
+        """Метрики всех приёмников по именам."""
+        return {worker.name: worker.snapshot() for worker in self.workers}
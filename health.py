@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class HealthMonitor:
+    """Сведения о живости бота для супервизора.
+    Бот здоров, пока итерации идут вовремя и ни одно сообщение
+    не ждёт доставки дольше stall_timeout
+    """
+
+    def __init__(self, retry_time, stall_timeout, heartbeat_file=None):
+        """Создание монитора с ожидаемой паузой между итерациями."""
+        self.retry_time = retry_time
+        self.stall_timeout = stall_timeout
+        self.heartbeat_file = heartbeat_file
+        self.started = time.time()
+        self.last_iteration = None
+        self.last_poll = None
+        self.last_send = None
+        self.loop_lag = 0.0
+        self.consecutive_errors = 0
+        self.errors = 0
+        self.providers = {}
+        self.delivery_age = None
+        self.lock = threading.Lock()
+
+    def register(self, name, provider):
+        """Добавление в отчёт значения, возвращаемого provider()."""
+        self.providers[name] = provider
+
+    def register_delivery(self, provider):
+        """Источник возраста самого старого недоставленного сообщения."""
+        self.delivery_age = provider
+
+    def record_poll(self):
+        """Отметка успешного запроса к АПИ домашки."""
+        with self.lock:
+            self.last_poll = time.time()
+            self.consecutive_errors = 0
+
+    def record_send(self):
+        """Отметка успешной отправки сообщения в Telegram."""
+        with self.lock:
+            self.last_send = time.time()
+
+    def record_error(self):
+        """Отметка итерации, завершившейся ошибкой."""
+        with self.lock:
+            self.consecutive_errors += 1
+            self.errors += 1
+
+    def record_iteration(self):
+        """Отметка завершения итерации и запись heartbeat-файла.
+        Отставание цикла считается как превышение интервала между
+        итерациями над RETRY_TIME
+        """
+        now = time.time()
+        with self.lock:
+            if self.last_iteration is not None:
+                self.loop_lag = max(
+                    0.0, now - self.last_iteration - self.retry_time
+                )
+            self.last_iteration = now
+        if self.heartbeat_file:
+            self.write_heartbeat()
+
+    def snapshot(self):
+        """Текущее состояние живости бота в виде словаря."""
+        now = time.time()
+        extra = {name: provider() for name, provider in self.providers.items()}
+        delivery_age = self.delivery_age() if self.delivery_age else 0.0
+        with self.lock:
+            since_iteration = now - (self.last_iteration or self.started)
+            return {
+                **extra,
+                'healthy': (since_iteration < self.stall_timeout
+                            and delivery_age < self.stall_timeout),
+                'seconds_since_iteration': round(since_iteration, 3),
+                'oldest_unsent_age': round(delivery_age, 3),
+                'last_iteration': self.last_iteration,
+                'stall_timeout': self.stall_timeout,
+                'loop_lag': round(self.loop_lag, 3),
+                'retry_time': self.retry_time,
+                'last_poll': self.last_poll,
+                'last_send': self.last_send,
+                'consecutive_errors': self.consecutive_errors,
+                'errors': self.errors,
+            }
+
+    def write_heartbeat(self):
+        """Атомарная запись состояния в heartbeat-файл.
+        В файле только абсолютные метки времени: записанный файл
+        не обновляется у зависшего бота, поэтому возраст последней
+        итерации считает читатель: time.time() - last_iteration
+        больше stall_timeout означает зависание
+        """
+        heartbeat = self.snapshot()
+        del heartbeat['healthy'], heartbeat['seconds_since_iteration']
+        tmp_path = f'{self.heartbeat_file}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(heartbeat, file)
+            os.replace(tmp_path, self.heartbeat_file)
+        except OSError as error:
+            logging.error(f'Ошибка записи heartbeat-файла: {error}')
+
+
+def start_health_server(monitor, port, host='127.0.0.1'):
+    """Запуск HTTP-эндпоинта живости в фоновом потоке.
+    Отвечает 200, пока итерации идут вовремя, и 503 при зависании.
+    Отчёт содержит имена подписчиков и приёмников, поэтому по умолчанию
+    эндпоинт доступен только локально
+    """
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            snapshot = monitor.snapshot()
+            body = json.dumps(snapshot).encode()
+            self.send_response(HTTPStatus.OK if snapshot['healthy']
+                               else HTTPStatus.SERVICE_UNAVAILABLE)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug(f'Health: {format % args}')
+
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f'Эндпоинт живости запущен на {host}:{port}')
+    return server
@@ -1,13 +1,27 @@
+import json
 import logging
 import os
+import signal
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
 
 import requests
 import telegram
 from dotenv import load_dotenv
 
+from bot_state import clear_state, load_state, open_store, save_state
+from coalescing import SingleFlight, memoize_calls
 from custom_exceptions import (ErrorSendMessage, ResponseNot200)
+from decoders import StreamedAnswer, decode_response, load_decoder
+from delivery import (PRIORITY_ERROR, PRIORITY_REVIEWING, PRIORITY_VERDICT,
+                      FanOut, LiveStatusCards, MessageBatcher, SinkWorker)
+from health import HealthMonitor, start_health_server
+from message_templates import MessageRenderer
+from tracing import Tracer
+from watchdog import MemoryWatchdog, restart
 
 load_dotenv()
 
@@ -17,73 +31,241 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_TIME = 5
+REQUEST_TIMEOUT = 10
+SHUTDOWN_TIMEOUT = int(os.getenv('SHUTDOWN_TIMEOUT', 25))
 WEEK = 7 * 24 * 60 * 60
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+
+MB = 1024 * 1024
+MEMORY_SOFT_LIMIT = int(os.getenv('MEMORY_SOFT_LIMIT_MB', 200)) * MB
+MEMORY_HARD_LIMIT = int(os.getenv('MEMORY_HARD_LIMIT_MB', 400)) * MB
+MAX_MEMORY_RESTARTS = int(os.getenv('MAX_MEMORY_RESTARTS', 5))
+MIN_UPTIME_BEFORE_RESTART = int(os.getenv('MIN_UPTIME_BEFORE_RESTART', 600))
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 5 * MB))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 3))
+MESSAGE_MAX_LENGTH = 4096
+MAX_PENDING_MESSAGES = int(os.getenv('MAX_PENDING_MESSAGES', 100))
+SHED_THRESHOLD = int(os.getenv('SHED_THRESHOLD', 20))
+BATCH_WINDOW = int(os.getenv('BATCH_WINDOW', 0))
+STATUS_CARD = os.getenv('STATUS_CARD', '').lower() in ('1', 'true', 'yes')
+DELIVERY_SINKS = json.loads(os.getenv('DELIVERY_SINKS') or 'null') or [
+    {'type': 'telegram', 'chat_id': TELEGRAM_CHAT_ID, 'card': STATUS_CARD},
+]
+TENANTS = json.loads(os.getenv('TENANTS') or 'null') or [
+    {'name': 'default', 'token': PRACTICUM_TOKEN, 'sinks': DELIVERY_SINKS},
+]
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 8))
+STATE_FILE = os.getenv('STATE_FILE', 'bot_state.bin')
+REDIS_URL = os.getenv('REDIS_URL')
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', '').lower() in (
+    '1', 'true', 'yes'
+)
+STREAM_CHUNK_SIZE = 64 * 1024
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 1.0))
+HEARTBEAT_FILE = os.getenv('HEARTBEAT_FILE', 'heartbeat.json')
+HEALTH_PORT = int(os.getenv('HEALTH_PORT', 0))
+HEALTH_HOST = os.getenv('HEALTH_HOST', '127.0.0.1')
+STALL_TIMEOUT = int(os.getenv('STALL_TIMEOUT',
+                              RETRY_TIME * 6 + REQUEST_TIMEOUT))
 
 HOMEWORK_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+VERDICTS_EN = {
+    'approved': 'Homework reviewed: the reviewer liked everything. Hooray!',
+    'reviewing': 'Homework has been taken for review.',
+    'rejected': 'Homework reviewed: the reviewer has remarks.'
+}
+STATUS_TEMPLATES = {
+    'ru': {
+        status: 'Изменился статус проверки работы "{homework_name}". '
+        + verdict
+        for status, verdict in HOMEWORK_STATUSES.items()
+    },
+    'en': {
+        status: 'Homework "{homework_name}" review status changed. '
+        + verdict
+        for status, verdict in VERDICTS_EN.items()
+    },
+}
+LOCALE = os.getenv('BOT_LOCALE', 'ru')
+UNKNOWN_STATUS_TEMPLATE = os.getenv('UNKNOWN_STATUS_TEMPLATE')
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', 1024))
+STATUS_PRIORITIES = {
+    'approved': PRIORITY_VERDICT,
+    'reviewing': PRIORITY_REVIEWING,
+    'rejected': PRIORITY_VERDICT,
+}
 
 logging.basicConfig(
     level=logging.DEBUG,
-    filename='bot_logs.log',
-    filemode='w',
+    handlers=[RotatingFileHandler('bot_logs.log',
+                                  maxBytes=LOG_MAX_BYTES,
+                                  backupCount=LOG_BACKUP_COUNT,
+                                  encoding='utf-8')],
     format=('[%(asctime)s], [%(levelname)s], [%(message)s],'
             ' [Модуль: %(module)s], [Имя функции: %(funcName)s],'
             ' [Строка: %(lineno)s]')
 )
 
 
+JSON_DECODER, json_loads = load_decoder(os.getenv('JSON_DECODER'))
+tracer = Tracer(TRACE_FILE, TRACE_SAMPLE_RATE)
+renderer = MessageRenderer(STATUS_TEMPLATES, UNKNOWN_STATUS_TEMPLATE,
+                           RENDER_CACHE_SIZE)
+upstream = SingleFlight()
+
+
+class GracefulStop:
+    """Флаг остановки по SIGTERM с отсчётом срока на завершение."""
+
+    def __init__(self, timeout):
+        """Создание флага и установка обработчика SIGTERM."""
+        self.timeout = timeout
+        self.deadline = None
+        self.event = threading.Event()
+        signal.signal(signal.SIGTERM, self.handle)
+
+    def handle(self, signum, frame):
+        """Обработчик сигнала: запуск отсчёта и выставление флага."""
+        self.deadline = time.monotonic() + self.timeout
+        self.event.set()
+
+    def remaining(self):
+        """Сколько секунд осталось до истечения срока завершения."""
+        if self.deadline is None:
+            return self.timeout
+        return max(0, self.deadline - time.monotonic())
+
+
 class MessageWithoutDublicate:
     """Функционал предотвращения отправки дублирующих сообщений в Telegram."""
 
-    def __init__(self, bot, previous_message=None):
+    def __init__(self, batcher, previous_message=None):
         """Создания объекта-отправителя сообщений."""
         self.previous_message = previous_message or ''
-        self.bot = bot
+        self.batcher = batcher
 
-    def check_and_send_message(self, message):
-        """Проверка, отправка сообщения, перезапись отправленного сообщения."""
+    def check_and_send_message(self, message, priority=PRIORITY_VERDICT):
+        """Проверка, постановка в очередь, перезапись сообщения."""
+        message = message[:MESSAGE_MAX_LENGTH]
         if message != self.previous_message:
-            send_message(self.bot, message)
+            self.batcher.add(TELEGRAM_CHAT_ID, message, priority)
             self.previous_message = message
 
 
-def send_message(bot, message):
-    """Функция отправки сообщений в Telegram."""
+def send_to_chat(bot, chat_id, message):
+    """Отправка сообщения в указанный чат Telegram."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        with tracer.span('send_message', message_length=len(message)):
+            bot.send_message(chat_id, message)
         logging.info(f'Отправлено сообщение в Telegram : {message}')
     except Exception as error:
-        raise ErrorSendMessage(f'Ошибка функции отправки сообщений >> {error}')
+        raise ErrorSendMessage(
+            f'Ошибка функции отправки сообщений >> {error}',
+            retry_after=getattr(error, 'retry_after', None)
+        )
+
+
+def send_webhook(url, message):
+    """Отправка сообщения POST-запросом на вебхук."""
+    try:
+        response = requests.post(url, json={'text': message},
+                                 timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        logging.info(f'Отправлено сообщение на вебхук {url}')
+    except Exception as error:
+        raise ErrorSendMessage(f'Ошибка отправки на вебхук >> {error}')
+
+
+def send_to_file(path, message):
+    """Дозапись сообщения в локальный файл."""
+    try:
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(f'{message}\n')
+    except OSError as error:
+        raise ErrorSendMessage(f'Ошибка записи сообщения в файл >> {error}')
+
+
+def send_message(bot, message):
+    """Функция отправки сообщений в Telegram."""
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
 
 
 def get_api_answer(current_timestamp):
     """Запрос к АПИ домашки.
     Возвращает словарь с работами и текущим временем
     """
-    timestamp = current_timestamp
-    params = {'from_date': timestamp}
+    return fetch_api_answer(PRACTICUM_TOKEN, current_timestamp)
+
+
+def fetch_api_answer(token, current_timestamp):
+    """Запрос к АПИ домашки с токеном token.
+    Одновременные запросы с тем же токеном и from_date объединяются
+    в один, ответ получают все ожидающие. Ответ общий, его нельзя менять
+    """
+    return upstream.do(
+        (token, current_timestamp),
+        lambda: request_api_answer(token, current_timestamp)
+    )
+
+
+def headers(token):
+    """Заголовки запроса к АПИ домашки с токеном token."""
+    return {'Authorization': f'OAuth {token}'}
+
+
+def request_api_answer(token, current_timestamp):
+    """Запрос к АПИ домашки без объединения."""
+    params = {'from_date': current_timestamp}
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        response = requests.get(ENDPOINT,
+                                headers=headers(token),
+                                params=params, timeout=REQUEST_TIMEOUT)
+        tracer.set_attribute('status_code', response.status_code)
         if response.status_code != 200:
             raise ResponseNot200(
                 'Нет ответа API:'
                 f' Код ответа: {response.status_code}'
-                f' URL: {response.request.url}'
-                f' Headers: {response.request.headers}'
+                f' URL: {ENDPOINT}'
                 f' Parameters: {params}'
             )
-        response_json = response.json()
+        response_json = decode_response(response, json_loads)
     except Exception as error:
         raise Exception(f'Ошибка обработки данных АПИ {error}')
     else:
         return response_json
 
 
+def get_api_stream(token, current_timestamp):
+    """Потоковый запрос к АПИ домашки для больших ответов.
+    Возвращает открытый ответ, который закрывает читающий его код.
+    Поток нельзя разделить между подписчиками, поэтому запросы
+    не объединяются
+    """
+    params = {'from_date': current_timestamp}
+    try:
+        response = requests.get(ENDPOINT,
+                                headers=headers(token),
+                                params=params, timeout=REQUEST_TIMEOUT,
+                                stream=True)
+        tracer.set_attribute('status_code', response.status_code)
+        if response.status_code != 200:
+            response.close()
+            raise ResponseNot200(
+                'Нет ответа API:'
+                f' Код ответа: {response.status_code}'
+                f' URL: {ENDPOINT}'
+                f' Parameters: {params}'
+            )
+    except Exception as error:
+        raise Exception(f'Ошибка обработки данных АПИ {error}')
+    return response
+
+
 def check_response(response_json):
     """Вытаскиваю список работ из ответа АПИ и возвращаю их.
     Проверка на то, что:
@@ -108,6 +290,22 @@ def check_response(response_json):
     return response_json['homeworks']
 
 
+def check_stream(answer):
+    """Проверка потокового ответа АПИ по мере чтения.
+    Те же проверки, что в check_response, но работы выдаются по одной
+    """
+    for homework in answer:
+        if not isinstance(homework, dict):
+            raise TypeError(f'Ожидается тип данных "словарь",'
+                            f'получен {type(homework)}')
+        yield homework
+    if 'homeworks' in answer.fields:
+        raise TypeError(f'Ожидается тип данных "список",'
+                        f'получен {type(answer.fields["homeworks"])}')
+    if not answer.homeworks_found and 'current_date' not in answer.fields:
+        raise KeyError(f'В ответе нет нужных ключей {answer.fields}')
+
+
 def parse_status(homework):
     """Обработка данных АПИ о конкретной ДЗ.
     Формирование статуса ДЗ и сообщения для
@@ -117,13 +315,7 @@ def parse_status(homework):
         raise KeyError('Нет ключа статус в словаре')
     homework_name = homework.get('homework_name')
     homework_status = homework.get('status')
-
-    if homework_status not in HOMEWORK_STATUSES:
-        raise KeyError('Ошибка получения статуса ДЗ')
-
-    verdict = HOMEWORK_STATUSES[homework_status]
-    return (f'Изменился статус проверки работы "{homework_name}".'
-            f' {verdict}')
+    return renderer.render(homework_name, homework_status, LOCALE)
 
 
 def check_tokens():
@@ -144,36 +336,261 @@ def get_homework(list_homeworks):
         return homework
 
 
+def read_answer(token, current_timestamp, fetch=fetch_api_answer):
+    """Запрос и проверка ответа АПИ целиком.
+    Возвращает последнюю работу и current_date
+    """
+    with tracer.span('get_api_answer'):
+        response_json = fetch(token, current_timestamp)
+    with tracer.span('check_response') as span:
+        list_homeworks = check_response(response_json)
+        span.set('homework_count', len(list_homeworks))
+    with tracer.span('get_homework'):
+        homework = get_homework(list_homeworks)
+    return homework, response_json.get('current_date')
+
+
+def read_stream(token, current_timestamp):
+    """Потоковое чтение ответа АПИ.
+    Возвращает последнюю работу и current_date, не накапливая
+    остальные работы в памяти. Соединение закрывается и при ошибке
+    разбора
+    """
+    with tracer.span('get_api_answer'):
+        response = get_api_stream(token, current_timestamp)
+    homework, count = None, 0
+    with response, tracer.span('check_response') as span:
+        answer = StreamedAnswer(response.iter_content(STREAM_CHUNK_SIZE))
+        for item in check_stream(answer):
+            homework = homework or item
+            count += 1
+        span.set('homework_count', count)
+    if homework:
+        logging.info(f'Проверяемая работа:'
+                     f'{homework.get("homework_name")}')
+    return homework, answer.fields.get('current_date')
+
+
+def poll_homeworks(sender, token, current_timestamp, health,
+                   fetch=fetch_api_answer):
+    """Одна итерация опроса: запрос к АПИ, разбор ответа, отправка статуса.
+    Возвращает метку времени для следующего запроса
+    """
+    if STREAM_RESPONSES:
+        homework, current_timestamp = read_stream(token, current_timestamp)
+    else:
+        homework, current_timestamp = read_answer(token, current_timestamp,
+                                                  fetch)
+    health.record_poll()
+    if homework:
+        with tracer.span('parse_status') as span:
+            message = parse_status(homework)
+            span.set('message_length', len(message))
+        sender.check_and_send_message(
+            message,
+            STATUS_PRIORITIES.get(homework['status'], PRIORITY_REVIEWING)
+        )
+    logging.info(f'Время из response: {current_timestamp}')
+    return current_timestamp
+
+
+def create_sink(bot, cards, config, index, on_sent, on_throttled):
+    """Создание приёмника по описанию из DELIVERY_SINKS.
+    Типы: telegram (chat_id, card), webhook (url), file (path);
+    max_queue, max_attempts и backoff задают очередь и повторы
+    """
+    sink_type = config['type']
+    if sink_type == 'telegram' and config.get('card'):
+        def send(message):
+            cards.update(config['chat_id'], message)
+    elif sink_type == 'telegram':
+        def send(message):
+            send_to_chat(bot, config['chat_id'], message)
+    elif sink_type == 'webhook':
+        def send(message):
+            send_webhook(config['url'], message)
+    elif sink_type == 'file':
+        def send(message):
+            send_to_file(config['path'], message)
+    else:
+        raise ValueError(f'Неизвестный тип приёмника {sink_type}')
+    return SinkWorker(
+        config.get('name', f'{sink_type}-{index}'),
+        send,
+        max_queue=config.get('max_queue', MAX_PENDING_MESSAGES),
+        max_attempts=config.get('max_attempts', 3),
+        backoff=config.get('backoff', 1.0),
+        on_sent=on_sent,
+        on_throttled=on_throttled,
+        tracer=tracer,
+    )
+
+
+class Tenant:
+    """Подписчик: токен Практикума, свой курсор опроса и свои приёмники."""
+
+    def __init__(self, config, bot, state, start_timestamp, health):
+        """Создание подписчика по описанию из TENANTS и его состоянию."""
+        self.name = config['name']
+        self.token = config['token']
+        self.current_timestamp = (state.get('current_timestamp')
+                                  or start_timestamp)
+        self.cards = LiveStatusCards(bot, state.get('card_message_ids'))
+        self.batcher = MessageBatcher(self.publish, BATCH_WINDOW,
+                                      MESSAGE_MAX_LENGTH,
+                                      MAX_PENDING_MESSAGES, SHED_THRESHOLD)
+        self.fanout = FanOut([
+            create_sink(bot, self.cards, sink, index, health.record_send,
+                        self.batcher.throttle)
+            for index, sink in enumerate(config.get('sinks', DELIVERY_SINKS))
+        ])
+        self.fanout.restore(state.get('pending', {}))
+        self.sender = MessageWithoutDublicate(
+            self.batcher, state.get('previous_message')
+        )
+
+    def poll(self, health, fetch=fetch_api_answer):
+        """Итерация опроса подписчика, сбой уходит в его же приёмники."""
+        with tracer.span('iteration', tenant=self.name,
+                         from_date=self.current_timestamp) as span:
+            try:
+                self.current_timestamp = poll_homeworks(
+                    self.sender, self.token, self.current_timestamp, health,
+                    fetch
+                )
+            except Exception as error:
+                health.record_error()
+                span.set('error', repr(error))
+                message = f'Сбой в работе программы: {error}'
+                logging.error(message)
+                self.sender.check_and_send_message(message, PRIORITY_ERROR)
+            self.batcher.flush()
+            self.fanout.pump()
+
+    def publish(self, chat_id, message, priority):
+        """Передача пачки накопителя во все приёмники подписчика."""
+        self.fanout.publish(chat_id, message, priority)
+
+    def snapshot(self, timeout):
+        """Состояние подписчика для следующего процесса.
+        Накопленные сообщения передаются приёмникам, приёмники
+        дорабатывают очередь за timeout секунд, недоставленное сохраняется
+        """
+        self.batcher.flush(force=True)
+        return {
+            'current_timestamp': self.current_timestamp,
+            'previous_message': self.sender.previous_message,
+            'card_message_ids': self.cards.message_ids,
+            'pending': self.fanout.stop(timeout),
+        }
+
+
+def poll_group(tenants, health):
+    """Опрос подписчиков с общими токеном и from_date одним запросом."""
+    fetch = memoize_calls(fetch_api_answer)
+    for tenant in tenants:
+        tenant.poll(health, fetch)
+
+
+def poll_round(executor, tenants, health):
+    """Раунд опроса всех подписчиков.
+    Подписчики группируются по (токен, from_date) заново в каждом
+    раунде, на группу уходит один запрос к АПИ независимо от порядка
+    подписчиков в TENANTS. Потоковые ответы не делятся, поэтому
+    при STREAM_RESPONSES каждый подписчик опрашивается отдельно
+    """
+    groups = {}
+    for tenant in tenants:
+        key = ((tenant.token, tenant.current_timestamp)
+               if not STREAM_RESPONSES else tenant.name)
+        groups.setdefault(key, []).append(tenant)
+    list(executor.map(lambda group: poll_group(group, health),
+                      groups.values()))
+
+
+def tenant_state(state, name):
+    """Состояние подписчика из снимка.
+    Снимок прежнего формата без подписчиков относится к default
+    """
+    if 'tenants' in state:
+        return state['tenants'].get(name, {})
+    return state if name == 'default' else {}
+
+
+def save_snapshot(store, tenants, timeout):
+    """Сохранение состояния всех подписчиков для следующего процесса."""
+    deadline = time.monotonic() + timeout
+    save_state(store, {'tenants': {
+        tenant.name: tenant.snapshot(max(0, deadline - time.monotonic()))
+        for tenant in tenants
+    }})
+    logging.info(f'Состояние бота сохранено в {store}')
+
+
+def register_metrics(health, watchdog, tenants):
+    """Подключение показателей подписчиков к отчёту и сторожу памяти."""
+    for tenant in tenants:
+        watchdog.register(tenant.batcher.compact)
+    watchdog.register(renderer.render.cache_clear)
+    health.register('sinks', lambda: {
+        tenant.name: tenant.fanout.metrics() for tenant in tenants
+    })
+    health.register('shed', lambda: {
+        tenant.name: dict(tenant.batcher.shed_counts) for tenant in tenants
+    })
+    health.register('pending', lambda: sum(
+        tenant.batcher.depth() for tenant in tenants
+    ))
+    health.register('upstream', lambda: dict(upstream.metrics))
+    health.register_delivery(lambda: max(
+        (tenant.fanout.oldest_age() for tenant in tenants), default=0.0
+    ))
+
+
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
         logging.critical('Отсутствие обязательных переменных'
                          ' окружения во время запуска бота')
         sys.exit('Ошибка доступа к токенам')
+    if LOCALE not in STATUS_TEMPLATES:
+        logging.critical(f'Неизвестная локаль BOT_LOCALE={LOCALE},'
+                         f' доступны: {", ".join(STATUS_TEMPLATES)}')
+        sys.exit(f'Неизвестная локаль {LOCALE}')
 
+    stop = GracefulStop(SHUTDOWN_TIMEOUT)
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time()) - WEEK * 4
-    sender = MessageWithoutDublicate(bot)
-
-    while True:
-        try:
-            response_json = get_api_answer(current_timestamp)
-            list_homeworks = check_response(response_json)
-            if list_homeworks:
-                homework = get_homework(list_homeworks)
-                message = parse_status(homework)
-                sender.check_and_send_message(message)
-            current_timestamp = response_json.get('current_date')
-            logging.info(f'Время из response: {current_timestamp}')
-        except ErrorSendMessage as error:
-            logging.error(f'Сбой при отправке'
-                          f'сообщения в Telegram: {error}')
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-            sender.check_and_send_message(message)
-        finally:
-            time.sleep(RETRY_TIME)
+    store = open_store(STATE_FILE, REDIS_URL)
+    state = load_state(store)
+    start_timestamp = int(time.time()) - WEEK * 4
+    health = HealthMonitor(RETRY_TIME, STALL_TIMEOUT, HEARTBEAT_FILE)
+    tenants = [
+        Tenant(config, bot, tenant_state(state, config['name']),
+               start_timestamp, health)
+        for config in TENANTS
+    ]
+    watchdog = MemoryWatchdog(MEMORY_SOFT_LIMIT, MEMORY_HARD_LIMIT)
+    register_metrics(health, watchdog, tenants)
+    if HEALTH_PORT:
+        start_health_server(health, HEALTH_PORT, HEALTH_HOST)
+    executor = ThreadPoolExecutor(POLL_WORKERS, thread_name_prefix='poll')
+
+    while not stop.event.is_set():
+        poll_round(executor, tenants, health)
+        health.record_iteration()
+        if state is not None:
+            clear_state(store)
+            state = None
+        if not watchdog.check():
+            save_snapshot(store, tenants, SHUTDOWN_TIMEOUT)
+            tracer.close()
+            restart(MAX_MEMORY_RESTARTS, MIN_UPTIME_BEFORE_RESTART)
+        stop.event.wait(RETRY_TIME)
+
+    logging.info('Получен SIGTERM, завершение работы бота')
+    executor.shutdown()
+    save_snapshot(store, tenants, stop.remaining())
+    tracer.close()
 
 
 if __name__ == '__main__':
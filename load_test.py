@@ -0,0 +1,354 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import telegram
+
+import homework
+from health import HealthMonitor
+from watchdog import get_rss
+
+API_PATH = '/api/user_api/homework_statuses/'
+FAKE_TELEGRAM_TOKEN = '12345:load-test'
+
+
+def percentile(values, share):
+    """Значение, ниже которого лежит доля share отсортированных значений."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class FakePracticum:
+    """Имитация АПИ Практикума.
+    У каждого токена одна текущая работа, которая при запросах
+    с вероятностью churn переходит reviewing -> approved/rejected ->
+    следующая работа. Время каждой смены статуса запоминается
+    по тексту сообщения, которое бот должен о ней отправить
+    """
+
+    def __init__(self, churn, latency):
+        """Создание имитации с вероятностью смены статуса и задержкой."""
+        self.churn = churn
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.homeworks = {}
+        self.updated = {}
+        self.expected = {}
+        self.requests = 0
+
+    def advance(self, token, current):
+        """Смена статуса текущей работы или выдача следующей."""
+        if current is None or current['status'] != 'reviewing':
+            number = current['id'] + 1 if current else 1
+            current = {'id': number, 'status': 'reviewing',
+                       'homework_name': f'{token}__hw{number}.zip'}
+        else:
+            current = {**current,
+                       'status': random.choice(('approved', 'rejected'))}
+        now = time.time()
+        self.homeworks[token] = current
+        self.updated[token] = int(now)
+        self.expected[homework.parse_status(current)] = now
+        return current
+
+    def answer(self, token, from_date):
+        """Ответ АПИ: работа, изменённая не раньше from_date."""
+        with self.lock:
+            self.requests += 1
+            current = self.homeworks.get(token)
+            if current is None or random.random() < self.churn:
+                current = self.advance(token, current)
+            fresh = self.updated[token] >= from_date
+        time.sleep(self.latency)
+        return {'homeworks': [current] if fresh else [],
+                'current_date': int(time.time())}
+
+    def handler(self):
+        """Класс обработчика HTTP-запросов для ThreadingHTTPServer."""
+        practicum = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                token = self.headers.get('Authorization', '')[len('OAuth '):]
+                from_date = float(parse_qs(url.query)['from_date'][0])
+                reply(self, practicum.answer(token, from_date))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class FakeTelegram:
+    """Имитация Bot API: принимает sendMessage и считает задержку доставки."""
+
+    def __init__(self, practicum, latency):
+        """Создание имитации, знающей ожидаемые сообщения Практикума."""
+        self.practicum = practicum
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Обнуление счётчиков перед очередным шагом нагрузки."""
+        self.latencies = []
+        self.messages = 0
+
+    def receive(self, text):
+        """Учёт сообщения и доставленных в нём смен статусов."""
+        now = time.time()
+        time.sleep(self.latency)
+        with self.lock:
+            self.messages += 1
+            for part in text.split('\n\n'):
+                changed = self.practicum.expected.pop(part, None)
+                if changed is not None:
+                    self.latencies.append(now - changed)
+
+    def handler(self):
+        """Класс обработчика HTTP-запросов для ThreadingHTTPServer."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                data = json.loads(body or b'{}')
+                fake.receive(data.get('text', ''))
+                reply(self, {'ok': True, 'result': {
+                    'message_id': 1, 'date': int(time.time()),
+                    'chat': {'id': int(data['chat_id']), 'type': 'private'},
+                    'text': data.get('text', ''),
+                }})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def reply(handler, data):
+    """Отправка JSON-ответа из обработчика."""
+    body = json.dumps(data, ensure_ascii=False).encode()
+    handler.send_response(HTTPStatus.OK)
+    handler.send_header('Content-Type', 'application/json')
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def serve(handler):
+    """Запуск HTTP-сервера на свободном локальном порту."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_fakes(args, conn):
+    """Процесс имитаций: АПИ Практикума и Telegram вне процесса бота.
+    Отправляет в conn порты серверов и отвечает на команды:
+    reset - обнуление счётчиков, latencies - задержки доставки,
+    None - завершение
+    """
+    practicum = FakePracticum(args.churn, args.upstream_latency)
+    fake_telegram = FakeTelegram(practicum, args.telegram_latency)
+    api_server = serve(practicum.handler())
+    telegram_server = serve(fake_telegram.handler())
+    conn.send((api_server.server_port, telegram_server.server_port))
+    while True:
+        command = conn.recv()
+        if command is None:
+            return
+        with fake_telegram.lock:
+            if command == 'reset':
+                fake_telegram.reset()
+                conn.send(None)
+            elif command == 'latencies':
+                conn.send(list(fake_telegram.latencies))
+
+
+def bot_step(count, args, ports, results):
+    """Процесс бота: count подписчиков, args.rounds итераций опроса.
+    Бот работает в отдельном свежем процессе, поэтому процессорное
+    время и прирост RSS относятся только к нему
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    api_port, telegram_port = ports
+    homework.ENDPOINT = f'http://127.0.0.1:{api_port}{API_PATH}'
+    bot = telegram.Bot(FAKE_TELEGRAM_TOKEN,
+                       base_url=f'http://127.0.0.1:{telegram_port}/bot')
+    health = HealthMonitor(args.interval, args.interval * 10)
+    rss_before = get_rss() or 0
+    tenants = [
+        homework.Tenant(
+            {'name': f'tenant-{index}',
+             'token': f'token-{index // args.tenants_per_token}',
+             'sinks': [{'type': 'telegram', 'chat_id': index + 1}]},
+            bot, {}, int(time.time()) - homework.WEEK, health
+        )
+        for index in range(count)
+    ]
+    executor = ThreadPoolExecutor(homework.POLL_WORKERS)
+    round_times = []
+    cpu_started, wall_started = time.process_time(), time.monotonic()
+    for _ in range(args.rounds):
+        started = time.monotonic()
+        homework.poll_round(executor, tenants, health)
+        round_times.append(time.monotonic() - started)
+        time.sleep(max(0.0, args.interval - round_times[-1]))
+    cpu_cores = ((time.process_time() - cpu_started)
+                 / (time.monotonic() - wall_started))
+    time.sleep(args.latency_slo)
+    rss_after = get_rss() or 0
+    sinks = [tenant.fanout.metrics() for tenant in tenants]
+    results.put({
+        'subscribers': count,
+        'round_p95': percentile(round_times, 0.95),
+        'error_rate': health.errors / max(1, count * args.rounds),
+        'dropped': sum(sink['dropped'] for metrics in sinks
+                       for sink in metrics.values()),
+        'queued': sum(sink['queued'] for metrics in sinks
+                      for sink in metrics.values()),
+        'cpu_cores': cpu_cores,
+        'rss_mb': rss_after / homework.MB,
+        'memory_per_subscriber_kb': (
+            max(0, rss_after - rss_before) / count / 1024
+        ),
+        'threads': threading.active_count(),
+        'upstream_requests': homework.upstream.metrics['calls'],
+    })
+    for tenant in tenants:
+        tenant.fanout.stop(1)
+    executor.shutdown()
+
+
+def run_step(count, args, ports, fakes):
+    """Прогон count подписчиков в отдельном процессе бота."""
+    fakes.send('reset')
+    fakes.recv()
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=bot_step,
+                              args=(count, args, ports, results))
+    process.start()
+    result = results.get()
+    process.join()
+    fakes.send('latencies')
+    latencies = fakes.recv()
+    result['delivery_p95'] = percentile(latencies, 0.95)
+    result['delivered'] = len(latencies)
+    return result
+
+
+def broken_slos(result, args):
+    """Нарушенные на шаге SLO."""
+    broken = []
+    if result['round_p95'] > args.interval:
+        broken.append('loop_lag')
+    if result['delivery_p95'] > args.latency_slo or result['queued']:
+        broken.append('delivery_latency')
+    if result['error_rate'] > args.error_slo:
+        broken.append('errors')
+    if result['dropped']:
+        broken.append('sink_drops')
+    if result['rss_mb'] * homework.MB > homework.MEMORY_SOFT_LIMIT:
+        broken.append('memory')
+    return broken
+
+
+def bottleneck(result, broken):
+    """Первое узкое место по показателям шага, нарушившего SLO."""
+    if 'memory' in broken:
+        return 'память: превышен MEMORY_SOFT_LIMIT'
+    if result['cpu_cores'] >= 0.9:
+        return 'CPU: процесс упёрся в одно ядро (GIL)'
+    if 'errors' in broken:
+        return 'ошибки опроса АПИ'
+    if 'loop_lag' in broken:
+        return 'опрос: не хватает POLL_WORKERS или АПИ отвечает медленно'
+    return 'доставка: очереди приёмников Telegram не успевают'
+
+
+def main():
+    """Наращивание числа подписчиков до нарушения SLO и отчёт."""
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный тест бота на локальных имитациях'
+                    ' АПИ Практикума и Telegram'
+    )
+    parser.add_argument('--start', type=int, default=10)
+    parser.add_argument('--factor', type=float, default=2.0)
+    parser.add_argument('--max', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='пауза между итерациями вместо RETRY_TIME')
+    parser.add_argument('--churn', type=float, default=0.2,
+                        help='вероятность смены статуса при запросе')
+    parser.add_argument('--tenants-per-token', type=int, default=1)
+    parser.add_argument('--upstream-latency', type=float, default=0.05)
+    parser.add_argument('--telegram-latency', type=float, default=0.02)
+    parser.add_argument('--latency-slo', type=float, default=3.0,
+                        help='p95 задержки от смены статуса до доставки')
+    parser.add_argument('--error-slo', type=float, default=0.01)
+    parser.add_argument('--report', help='файл для JSON-отчёта')
+    args = parser.parse_args()
+
+    fakes, fakes_end = multiprocessing.Pipe()
+    fakes_process = multiprocessing.get_context('spawn').Process(
+        target=serve_fakes, args=(args, fakes_end), daemon=True
+    )
+    fakes_process.start()
+    ports = fakes.recv()
+
+    steps, passed, failed = [], None, None
+    count = args.start
+    while count <= args.max:
+        result = run_step(count, args, ports, fakes)
+        result['broken'] = broken_slos(result, args)
+        steps.append(result)
+        print(f"{count:>6} подписчиков: итерация p95"
+              f" {result['round_p95']:.2f} с, доставка p95"
+              f" {result['delivery_p95']:.2f} с, CPU"
+              f" {result['cpu_cores']:.2f} ядра, RSS"
+              f" {result['rss_mb']:.0f} МБ,"
+              f" нарушено: {', '.join(result['broken']) or 'нет'}")
+        if result['broken']:
+            failed = result
+            break
+        passed = result
+        count = max(count + 1, int(count * args.factor))
+
+    report = {
+        'max_subscribers': passed and passed['subscribers'],
+        'subscribers_per_core': passed and round(
+            passed['subscribers'] / max(passed['cpu_cores'], 0.01)
+        ),
+        'memory_per_subscriber_kb': passed and round(
+            passed['memory_per_subscriber_kb'], 1
+        ),
+        'first_bottleneck': failed and bottleneck(failed, failed['broken']),
+        'cpu_count': os.cpu_count(),
+        'steps': steps,
+    }
+    print(json.dumps({key: value for key, value in report.items()
+                      if key != 'steps'}, ensure_ascii=False, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    fakes.send(None)
+    fakes_process.join()
+
+
+if __name__ == '__main__':
+    main()
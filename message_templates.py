@@ -0,0 +1,72 @@
+from functools import lru_cache
+from string import Formatter
+
+TEMPLATE_FIELDS = frozenset(('homework_name', 'status'))
+
+
+def compile_template(text):
+    """Проверка полей шаблона и подготовка функции подстановки.
+    Шаблон разбирается один раз на постоянные части и места полей,
+    подстановка только склеивает части без повторного разбора
+    """
+    parts, slots = [], []
+    for literal, field, spec, conversion in Formatter().parse(text):
+        if literal:
+            parts.append(literal)
+        if field is None:
+            continue
+        if field not in TEMPLATE_FIELDS:
+            raise ValueError(f'Неизвестное поле шаблона "{field}"'
+                             f' в "{text}"')
+        if spec or conversion:
+            raise ValueError(f'Форматирование поля "{field}" не'
+                             f' поддерживается в "{text}"')
+        slots.append((len(parts), field))
+        parts.append('')
+
+    def substitute(values):
+        result = parts.copy()
+        for index, field in slots:
+            result[index] = str(values[field])
+        return ''.join(result)
+
+    return substitute
+
+
+class MessageRenderer:
+    """Сборка сообщений о статусе работы по шаблонам.
+    Шаблоны по локалям и статусам компилируются один раз при создании,
+    готовые сообщения кэшируются по (работа, статус, локаль).
+    Для неизвестного статуса используется шаблон fallback,
+    а без него выбрасывается KeyError
+    """
+
+    def __init__(self, templates, fallback=None, cache_size=1024):
+        """Создание по словарю {локаль: {статус: шаблон}}."""
+        self.templates = {
+            (locale, status): compile_template(text)
+            for locale, statuses in templates.items()
+            for status, text in statuses.items()
+        }
+        self.fallback = compile_template(fallback) if fallback else None
+        self.render = lru_cache(maxsize=cache_size)(self.render_uncached)
+
+    def render_uncached(self, homework_name, status, locale):
+        """Подстановка названия работы и статуса в шаблон."""
+        template = self.templates.get((locale, status), self.fallback)
+        if template is None:
+            raise KeyError('Ошибка получения статуса ДЗ')
+        return template({'homework_name': homework_name, 'status': status})
+
+    def render_many(self, transitions, locale):
+        """Сборка сообщений для пар (название работы, статус) разом.
+        Неизвестные статусы без fallback пропускаются
+        """
+        render = self.render
+        messages = []
+        for homework_name, status in transitions:
+            try:
+                messages.append(render(homework_name, status, locale))
+            except KeyError:
+                continue
+        return messages
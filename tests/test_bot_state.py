@@ -0,0 +1,51 @@
+import json
+import zlib
+
+from bot_state import (MAGIC, FileStore, clear_state, decode_state,
+                       encode_state, load_state, save_state)
+
+STATE = {'tenants': {'default': {
+    'current_timestamp': 1581604970,
+    'previous_message': 'Работа взята на проверку ревьюером.',
+    'card_message_ids': {'123': 7},
+    'pending': {'telegram-0': [[0, 'Работа проверена']]},
+}}}
+
+
+class TestBotState:
+
+    def test_round_trip(self, tmp_path):
+        store = FileStore(str(tmp_path / 'state.bin'))
+        save_state(store, STATE)
+        assert load_state(store) == STATE, (
+            'Проверьте, что состояние восстанавливается без изменений'
+        )
+        assert load_state(store) == STATE, (
+            'Проверьте, что загрузка не удаляет снимок до успешного запуска'
+        )
+        clear_state(store)
+        assert load_state(store) == {}
+
+    def test_format_is_versioned_json(self):
+        data = encode_state(STATE)
+        assert data.startswith(MAGIC)
+        assert json.loads(zlib.decompress(data[len(MAGIC) + 1:])) == STATE
+
+    def test_legacy_json(self):
+        legacy = {'current_timestamp': 1, 'previous_message': 'text'}
+        assert decode_state(json.dumps(legacy).encode()) == legacy
+
+    def test_unknown_version_ignored(self, tmp_path):
+        path = tmp_path / 'state.bin'
+        path.write_bytes(MAGIC + bytes((1,)) + zlib.compress(b'\x00'))
+        assert load_state(FileStore(str(path))) == {}
+
+    def test_corrupted_state_ignored(self, tmp_path):
+        path = tmp_path / 'state.bin'
+        path.write_bytes(MAGIC + bytes((2,)) + b'garbage')
+        assert load_state(FileStore(str(path))) == {}
+
+    def test_missing_state(self, tmp_path):
+        store = FileStore(str(tmp_path / 'state.bin'))
+        assert load_state(store) == {}
+        clear_state(store)
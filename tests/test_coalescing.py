@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import homework
+from coalescing import SingleFlight, memoize_calls
+from health import HealthMonitor
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_coalesced(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def request():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'current_date': 1}
+
+        with ThreadPoolExecutor(3) as executor:
+            leader = executor.submit(flight.do, 'key', request)
+            started.wait(5)
+            followers = [executor.submit(flight.do, 'key', request)
+                         for _ in range(2)]
+            while flight.metrics['coalesced'] < 2:
+                pass
+            release.set()
+            results = [leader.result()] + [
+                future.result() for future in followers
+            ]
+        assert calls == [1], (
+            'Проверьте, что одновременные вызовы с одним ключом'
+            ' выполняются один раз'
+        )
+        assert results == [{'current_date': 1}] * 3
+        assert flight.metrics == {'calls': 1, 'coalesced': 2}
+
+    def test_error_and_next_call(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('Сбой')
+
+        with pytest.raises(ValueError):
+            flight.do('key', fail)
+        assert flight.do('key', lambda: 1) == 1, (
+            'Проверьте, что завершённый вызов не кэшируется'
+        )
+
+
+class TestMemoizeCalls:
+
+    def test_result_and_error_reused(self):
+        calls = []
+
+        def function(value):
+            calls.append(value)
+            if value < 0:
+                raise ValueError(value)
+            return value * 2
+
+        memoized = memoize_calls(function)
+        assert memoized(2) == memoized(2) == 4
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                memoized(-1)
+        assert calls == [2, -1]
+
+
+class TestPollRound:
+
+    def test_one_request_per_token_and_date(self, monkeypatch, tmp_path):
+        requests = []
+
+        def request_api_answer(token, current_timestamp):
+            requests.append((token, current_timestamp))
+            return {'homeworks': [], 'current_date': current_timestamp + 1}
+
+        monkeypatch.setattr(homework, 'request_api_answer',
+                            request_api_answer)
+        health = HealthMonitor(5, 30)
+        sinks = [{'type': 'file', 'path': str(tmp_path / 'messages.txt')}]
+        configs = [('a', 'token-1', 10), ('b', 'token-2', 10),
+                   ('c', 'token-1', 10), ('d', 'token-1', 20)]
+        tenants = [
+            homework.Tenant({'name': name, 'token': token, 'sinks': sinks},
+                            None, {'current_timestamp': timestamp}, 1,
+                            health)
+            for name, token, timestamp in configs
+        ]
+        with ThreadPoolExecutor(2) as executor:
+            homework.poll_round(executor, tenants, health)
+        assert sorted(requests) == [
+            ('token-1', 10), ('token-1', 20), ('token-2', 10)
+        ], 'Проверьте, что на пару (токен, from_date) уходит один запрос'
+        assert [tenant.current_timestamp for tenant in tenants] == [
+            11, 11, 11, 21
+        ]
+
+    def test_tenant_default_sinks(self):
+        tenant = homework.Tenant({'name': 'a', 'token': 'token'}, None, {},
+                                 1, HealthMonitor(5, 30))
+        assert len(tenant.fanout.workers) == len(homework.DELIVERY_SINKS), (
+            'Проверьте, что без sinks подписчик использует DELIVERY_SINKS'
+        )
@@ -0,0 +1,146 @@
+import importlib
+import json
+import logging
+
+import pytest
+
+import homework
+from decoders import StreamedAnswer, load_decoder
+
+ANSWER = json.dumps({
+    'homeworks': [
+        {'homework_name': 'hw1.zip', 'status': 'approved', 'id': 123456},
+        {'homework_name': 'hw2.zip', 'status': 'reviewing', 'id': 7},
+    ],
+    'current_date': 1581604970,
+}, ensure_ascii=False).encode()
+
+
+def chunks(data, size):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+class TestStreamedAnswer:
+
+    @pytest.mark.parametrize('size', [1, 3, 7, len(ANSWER)])
+    def test_split_chunks(self, size):
+        answer = StreamedAnswer(chunks(ANSWER, size))
+        homeworks = list(answer)
+        assert homeworks == json.loads(ANSWER)['homeworks'], (
+            'Проверьте, что работы разбираются при любой границе фрагментов'
+        )
+        assert answer.fields == {'current_date': 1581604970}
+
+    def test_split_multibyte(self):
+        data = json.dumps(
+            {'homeworks': [{'homework_name': 'Дипломная работа'}]},
+            ensure_ascii=False
+        ).encode()
+        assert list(StreamedAnswer(chunks(data, 1))) == [
+            {'homework_name': 'Дипломная работа'}
+        ]
+
+    @pytest.mark.parametrize('cut', [1, 20, len(ANSWER) - 1])
+    def test_truncated(self, cut):
+        with pytest.raises(ValueError):
+            list(StreamedAnswer([ANSWER[:cut]]))
+
+    def test_check_stream(self):
+        answer = StreamedAnswer(chunks(ANSWER, 5))
+        assert [item['id'] for item in homework.check_stream(answer)] == [
+            123456, 7
+        ]
+
+    def test_check_stream_not_list(self):
+        answer = StreamedAnswer([b'{"homeworks": {"a": 1},'
+                                 b' "current_date": 1}'])
+        with pytest.raises(TypeError):
+            list(homework.check_stream(answer))
+
+    def test_check_stream_not_dict(self):
+        answer = StreamedAnswer([b'{"homeworks": [1], "current_date": 1}'])
+        with pytest.raises(TypeError):
+            list(homework.check_stream(answer))
+
+    def test_check_stream_no_keys(self):
+        with pytest.raises(KeyError):
+            list(homework.check_stream(StreamedAnswer([b'{"error": 1}'])))
+
+
+class FakeStreamResponse:
+
+    def __init__(self, status_code, body=b''):
+        self.status_code = status_code
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(chunks(self.body, 4))
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TestReadStream:
+
+    def patch_get(self, monkeypatch, response):
+        monkeypatch.setattr(homework.requests, 'get',
+                            lambda *args, **kwargs: response)
+
+    def test_reads_and_closes(self, monkeypatch):
+        response = FakeStreamResponse(200, ANSWER)
+        self.patch_get(monkeypatch, response)
+        current, current_date = homework.read_stream('token', 0)
+        assert current['id'] == 123456 and current_date == 1581604970
+        assert response.closed
+
+    def test_closed_on_non_200(self, monkeypatch):
+        response = FakeStreamResponse(500)
+        self.patch_get(monkeypatch, response)
+        with pytest.raises(Exception):
+            homework.read_stream('token', 0)
+        assert response.closed, (
+            'Проверьте, что ответ с ошибкой закрывается'
+        )
+
+    def test_closed_on_broken_body(self, monkeypatch):
+        response = FakeStreamResponse(200, b'{"homeworks": [1], "curr')
+        self.patch_get(monkeypatch, response)
+        with pytest.raises(TypeError):
+            homework.read_stream('token', 0)
+        assert response.closed, (
+            'Проверьте, что поток закрывается при ошибке разбора'
+        )
+
+
+class TestLoadDecoder:
+
+    def test_fallback_without_fast_decoders(self, monkeypatch, caplog):
+        def import_module(name):
+            raise ImportError(name)
+
+        monkeypatch.setattr(importlib, 'import_module', import_module)
+        with caplog.at_level(logging.WARNING):
+            name, loads = load_decoder()
+        assert (name, loads) == ('json', json.loads), (
+            'Проверьте, что без быстрых библиотек используется json'
+        )
+        assert not caplog.records, (
+            'Отсутствие необязательных декодеров не должно давать'
+            ' предупреждений'
+        )
+
+    def test_missing_explicit_decoder(self, caplog):
+        with caplog.at_level(logging.WARNING):
+            name, loads = load_decoder('no_such_json_module')
+        assert (name, loads) == ('json', json.loads)
+        assert caplog.records, (
+            'Проверьте, что об отсутствии заданного декодера'
+            ' пишется предупреждение'
+        )
@@ -0,0 +1,270 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from custom_exceptions import ErrorSendMessage
+from delivery import (PRIORITY_ERROR, PRIORITY_REVIEWING, PRIORITY_VERDICT,
+                      FanOut, LiveStatusCards, MessageBatcher, SinkWorker)
+from tracing import Tracer
+
+
+class ManualExecutor:
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, function):
+        self.tasks.append(function)
+
+    def run(self):
+        while self.tasks:
+            self.tasks.pop(0)()
+
+
+class FlakySend:
+
+    def __init__(self, failures=0, retry_after=None):
+        self.failures = failures
+        self.retry_after = retry_after
+        self.sent = []
+
+    def __call__(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise ErrorSendMessage('Сбой', retry_after=self.retry_after)
+        self.sent.append(message)
+
+
+class FakeCardBot:
+
+    def __init__(self, pin_error=None, edit_error=None):
+        self.sent = []
+        self.edited = []
+        self.pin_error = pin_error
+        self.edit_error = edit_error
+
+    def send_message(self, chat_id, text):
+        self.sent.append(text)
+        return SimpleNamespace(message_id=len(self.sent))
+
+    def pin_chat_message(self, chat_id, message_id, disable_notification):
+        if self.pin_error:
+            raise self.pin_error
+
+    def edit_message_text(self, text, chat_id, message_id):
+        if self.edit_error:
+            raise self.edit_error
+        self.edited.append((message_id, text))
+
+
+class TestLiveStatusCards:
+
+    def test_pin_failure_keeps_card(self):
+        bot = FakeCardBot(pin_error=Exception('not enough rights'))
+        cards = LiveStatusCards(bot)
+        cards.update(1, 'first')
+        cards.update(1, 'second')
+        assert bot.sent == ['first'], (
+            'Проверьте, что ошибка закрепления не приводит к отправке'
+            ' новой карточки'
+        )
+        assert bot.edited == [(1, 'second')]
+
+    def test_deleted_card_recreated(self):
+        bot = FakeCardBot()
+        cards = LiveStatusCards(bot, {'1': 7})
+        bot.edit_error = Exception('Message to edit not found')
+        cards.update(1, 'text')
+        assert bot.sent == ['text'], (
+            'Проверьте, что удалённая карточка создаётся заново'
+        )
+        assert cards.message_ids == {'1': 1}
+
+    def test_edit_error_keeps_card(self):
+        bot = FakeCardBot(edit_error=Exception('Timed out'))
+        cards = LiveStatusCards(bot, {'1': 7})
+        with pytest.raises(ErrorSendMessage):
+            cards.update(1, 'text')
+        assert cards.message_ids == {'1': 7}, (
+            'Проверьте, что временная ошибка не сбрасывает id карточки'
+        )
+        assert bot.sent == []
+
+
+class TestMessageBatcher:
+
+    def test_shed_keeps_verdicts(self):
+        sent = []
+        batcher = MessageBatcher(
+            lambda *args: sent.append(args), shed_threshold=2
+        )
+        batcher.add(1, 'v1', PRIORITY_VERDICT)
+        for message in ('r1', 'r2'):
+            batcher.add(1, message, PRIORITY_REVIEWING)
+        for message in ('e1', 'e2'):
+            batcher.add(1, message, PRIORITY_ERROR)
+        assert batcher.shed_counts == {
+            'verdict': 0, 'reviewing': 1, 'error': 1
+        }, 'Проверьте, что под нагрузкой сбрасываются только низшие классы'
+        assert batcher.flush(force=True) == 1
+        assert sent == [(1, 'v1\n\nr2\n\ne2', PRIORITY_VERDICT)]
+
+    def test_combine_respects_max_length(self):
+        sent = []
+        batcher = MessageBatcher(lambda *args: sent.append(args),
+                                 max_length=7)
+        batcher.add(1, 'aaa', PRIORITY_ERROR)
+        batcher.add(1, 'bbb', PRIORITY_ERROR)
+        batcher.add(1, 'c', PRIORITY_ERROR)
+        assert batcher.flush(force=True) == 2
+        assert sent == [(1, 'aaa', PRIORITY_ERROR),
+                        (1, 'bbb\n\nc', PRIORITY_ERROR)]
+
+    def test_throttle_holds_batches(self):
+        sent = []
+        batcher = MessageBatcher(lambda *args: sent.append(args))
+        batcher.throttle(60)
+        batcher.add(1, 'e1', PRIORITY_ERROR)
+        batcher.add(1, 'e2', PRIORITY_ERROR)
+        assert batcher.flush() == 0 and sent == [], (
+            'Проверьте, что во время паузы Telegram пачки не отправляются'
+        )
+        assert batcher.shed_counts['error'] == 1
+
+
+class TestSinkWorker:
+
+    def test_full_queue_evicts_lowest_class(self):
+        executor, send = ManualExecutor(), FlakySend()
+        worker = SinkWorker('test', send, executor, max_queue=3)
+        worker.put('verdict', PRIORITY_VERDICT)
+        for number in range(5):
+            worker.put(f'error {number}', PRIORITY_ERROR)
+        executor.run()
+        assert send.sent == ['verdict', 'error 3', 'error 4'], (
+            'Проверьте, что при переполнении вытесняются сообщения'
+            ' низшего класса, а вердикт доставляется'
+        )
+        assert worker.snapshot()['shed'] == {
+            'verdict': 0, 'reviewing': 0, 'error': 3
+        }
+        assert worker.metrics['dropped'] == 3
+
+    def test_full_queue_drops_incoming_lower_class(self):
+        executor, send = ManualExecutor(), FlakySend()
+        worker = SinkWorker('test', send, executor, max_queue=2)
+        worker.put('v1', PRIORITY_VERDICT)
+        worker.put('v2', PRIORITY_VERDICT)
+        worker.put('error', PRIORITY_ERROR)
+        executor.run()
+        assert send.sent == ['v1', 'v2']
+        assert worker.shed_counts['error'] == 1
+
+    def test_retry_after_throttles_batcher(self):
+        executor, send = ManualExecutor(), FlakySend(1, retry_after=30)
+        throttled = []
+        worker = SinkWorker('test', send, executor,
+                            on_throttled=throttled.append)
+        worker.put('message')
+        executor.run()
+        assert throttled == [30], (
+            'Проверьте, что retry_after передаётся накопителю'
+        )
+        assert send.sent == [] and worker.snapshot()['queued'] == 1
+        worker.schedule()
+        assert not executor.tasks, (
+            'Проверьте, что до конца паузы доставка не возобновляется'
+        )
+        worker.not_before = 0
+        worker.schedule()
+        executor.run()
+        assert send.sent == ['message']
+        assert worker.metrics['retries'] == 1
+
+    def test_gives_up_after_max_attempts(self):
+        executor, send = ManualExecutor(), FlakySend(5)
+        worker = SinkWorker('test', send, executor, max_attempts=2,
+                            backoff=0)
+        worker.put('message')
+        executor.run()
+        worker.schedule()
+        executor.run()
+        assert worker.metrics == {
+            'sent': 0, 'failed': 1, 'retries': 1, 'dropped': 0
+        }
+
+    def test_finish_delivers_queue(self):
+        send = FlakySend()
+        with ThreadPoolExecutor(2) as executor:
+            worker = SinkWorker('test', send, executor)
+            for number in range(3):
+                worker.put(f'message {number}')
+            assert worker.finish(5) == []
+        assert send.sent == ['message 0', 'message 1', 'message 2']
+
+    def test_finish_returns_unsent(self):
+        executor, send = ManualExecutor(), FlakySend(10)
+        worker = SinkWorker('test', send, executor)
+        worker.put('error', PRIORITY_ERROR)
+        worker.put('verdict', PRIORITY_VERDICT)
+        assert worker.finish(0) == [[PRIORITY_VERDICT, 'verdict'],
+                                    [PRIORITY_ERROR, 'error']], (
+            'Проверьте, что недоставленные сообщения возвращаются'
+            ' вместе с классами'
+        )
+
+    def test_send_span_is_child_of_iteration(self):
+        tracer = Tracer()
+        parents = []
+
+        def send(message):
+            with tracer.span('send_message') as span:
+                parents.append(span.parent_id)
+
+        executor = ManualExecutor()
+        worker = SinkWorker('test', send, executor, tracer=tracer)
+        with tracer.span('iteration') as iteration:
+            worker.put('message')
+        executor.run()
+        assert parents == [iteration.span_id], (
+            'Проверьте, что отправка попадает в отрезок итерации'
+        )
+
+    def test_slow_sinks_do_not_block_fast_one(self):
+        release, delivered = threading.Event(), threading.Event()
+
+        def slow(message):
+            release.wait(5)
+
+        def fast(message):
+            delivered.set()
+
+        workers = [SinkWorker(f'slow-{number}', slow) for number in range(16)]
+        workers.append(SinkWorker('fast', fast))
+        fanout = FanOut(workers)
+        try:
+            started = time.monotonic()
+            fanout.publish(1, 'verdict', PRIORITY_VERDICT)
+            assert delivered.wait(1), (
+                'Проверьте, что медленные приёмники не задерживают быстрый'
+            )
+            assert time.monotonic() - started < 1
+        finally:
+            release.set()
+            fanout.stop(5)
+
+    def test_oldest_age_includes_waiting_messages(self):
+        executor, send = ManualExecutor(), FlakySend()
+        worker = SinkWorker('test', send, executor)
+        assert worker.oldest_age() == 0
+        worker.put('message')
+        message, parent, attempts, queued_at = worker.queues[0][0]
+        worker.queues[0][0] = (message, parent, attempts, queued_at - 60)
+        assert worker.oldest_age() >= 60, (
+            'Проверьте, что возраст считается от постановки в очередь'
+        )
+        executor.run()
+        assert worker.oldest_age() == 0
@@ -0,0 +1,62 @@
+import json
+import time
+
+from health import HealthMonitor, start_health_server
+
+
+class TestHealth:
+
+    def test_heartbeat_has_absolute_timestamp(self, tmp_path):
+        heartbeat_file = tmp_path / 'heartbeat.json'
+        monitor = HealthMonitor(5, 30, str(heartbeat_file))
+        before = time.time()
+        monitor.record_iteration()
+        heartbeat = json.loads(heartbeat_file.read_text())
+        assert 'healthy' not in heartbeat, (
+            'heartbeat-файл не должен содержать вычисленный при записи'
+            ' признак живости'
+        )
+        assert heartbeat['last_iteration'] >= before, (
+            'Проверьте, что в heartbeat-файл пишется время последней итерации'
+        )
+        assert heartbeat['stall_timeout'] == 30
+
+    def test_snapshot_detects_stall(self):
+        monitor = HealthMonitor(5, 30)
+        monitor.record_iteration()
+        monitor.last_iteration -= 60
+        assert not monitor.snapshot()['healthy'], (
+            'Проверьте, что без итераций дольше stall_timeout бот нездоров'
+        )
+
+    def test_errors_total(self):
+        monitor = HealthMonitor(5, 30)
+        monitor.record_error()
+        monitor.record_error()
+        monitor.record_poll()
+        snapshot = monitor.snapshot()
+        assert snapshot['consecutive_errors'] == 0
+        assert snapshot['errors'] == 2, (
+            'Проверьте, что общий счётчик ошибок не сбрасывается'
+            ' успешным опросом'
+        )
+
+    def test_stuck_delivery_unhealthy(self):
+        monitor = HealthMonitor(5, 30)
+        monitor.record_iteration()
+        monitor.register_delivery(lambda: 31.0)
+        snapshot = monitor.snapshot()
+        assert not snapshot['healthy'], (
+            'Проверьте, что зависшая доставка делает бота нездоровым'
+        )
+        assert snapshot['oldest_unsent_age'] == 31.0
+
+    def test_server_is_local_by_default(self):
+        server = start_health_server(HealthMonitor(5, 30), 0)
+        try:
+            assert server.server_address[0] == '127.0.0.1', (
+                'Проверьте, что эндпоинт живости доступен только локально'
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,48 @@
+import pytest
+
+from message_templates import MessageRenderer, compile_template
+
+TEMPLATES = {
+    'ru': {'approved': 'Работа "{homework_name}" принята'},
+    'en': {'approved': 'Homework "{homework_name}" accepted'},
+}
+
+
+class TestMessageRenderer:
+
+    def test_render(self):
+        renderer = MessageRenderer(TEMPLATES)
+        assert renderer.render('hw.zip', 'approved', 'en') == (
+            'Homework "hw.zip" accepted'
+        )
+        assert renderer.render('hw.zip', 'approved', 'ru') == (
+            'Работа "hw.zip" принята'
+        )
+
+    def test_compiled_template_matches_format(self):
+        text = '{{{status}}}: {homework_name}, {status}!'
+        values = {'homework_name': 'hw', 'status': 'approved'}
+        assert compile_template(text)(values) == text.format_map(values), (
+            'Проверьте, что подстановка совпадает с str.format'
+        )
+
+    def test_unknown_status_without_fallback(self):
+        renderer = MessageRenderer(TEMPLATES)
+        with pytest.raises(KeyError):
+            renderer.render('hw.zip', 'unknown', 'ru')
+        assert renderer.render_many(
+            [('hw.zip', 'unknown'), ('hw.zip', 'approved')], 'ru'
+        ) == ['Работа "hw.zip" принята']
+
+    def test_fallback(self):
+        renderer = MessageRenderer(TEMPLATES, '{homework_name}: {status}')
+        assert renderer.render('hw.zip', 'on_hold', 'ru') == (
+            'hw.zip: on_hold'
+        ), 'Проверьте, что для неизвестного статуса используется fallback'
+
+    @pytest.mark.parametrize('text', [
+        '{reviewer}', '{}', '{status!r}', '{homework_name:>10}'
+    ])
+    def test_invalid_template(self, text):
+        with pytest.raises(ValueError):
+            compile_template(text)
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+
+import tracing
+from tracing import Tracer
+
+
+def read_spans(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestTracer:
+
+    def test_jsonl_with_otlp_fields(self, tmp_path):
+        path = tmp_path / 'trace.jsonl'
+        tracer = Tracer(str(path))
+        with tracer.span('iteration', tenant='default') as root:
+            with tracer.span('get_api_answer') as child:
+                tracer.set_attribute('status_code', 200)
+        tracer.close()
+        spans = {span['name']: span for span in read_spans(path)}
+        assert set(spans) == {'iteration', 'get_api_answer'}
+        assert set(spans['iteration']) == {
+            'name', 'traceId', 'spanId', 'parentSpanId',
+            'startTimeUnixNano', 'endTimeUnixNano', 'attributes'
+        }, 'Проверьте имена полей отрезка в формате OTLP'
+        assert spans['iteration']['spanId'] == root.span_id
+        assert spans['iteration']['parentSpanId'] is None
+        assert spans['get_api_answer']['parentSpanId'] == root.span_id
+        assert spans['get_api_answer']['traceId'] == child.trace_id
+        assert spans['get_api_answer']['attributes'] == {'status_code': 200}
+        assert spans['iteration']['attributes'] == {'tenant': 'default'}
+
+    def test_zero_sample_rate_writes_nothing(self, tmp_path):
+        path = tmp_path / 'trace.jsonl'
+        tracer = Tracer(str(path), sample_rate=0)
+        with tracer.span('iteration'):
+            with tracer.span('send_message'):
+                pass
+        tracer.close()
+        assert read_spans(path) == []
+
+    def test_children_inherit_root_sampling(self, tmp_path, monkeypatch):
+        tracer = Tracer(str(tmp_path / 'trace.jsonl'), sample_rate=0.5)
+        for draw, sampled in ((0.9, False), (0.1, True)):
+            monkeypatch.setattr(tracing.random, 'random', lambda: draw)
+            with tracer.span('iteration') as root:
+                monkeypatch.setattr(tracing.random, 'random',
+                                    lambda: 1 - draw)
+                with tracer.span('parse_status') as child:
+                    pass
+            assert root.sampled is sampled
+            assert child.sampled is sampled, (
+                'Проверьте, что дочерние отрезки наследуют решение'
+                ' о сохранении корневого'
+            )
+        tracer.close()
+
+    def test_full_queue_drops_spans(self, tmp_path):
+        tracer = Tracer(str(tmp_path / 'trace.jsonl'), max_queue=1)
+        release = threading.Event()
+        tracer.run = release.wait
+        for _ in range(3):
+            with tracer.span('iteration'):
+                pass
+        assert tracer.dropped == 2, (
+            'Проверьте, что при переполнении очереди отрезки отбрасываются'
+        )
+        release.set()
+        tracer.exporter.join(1)
+        tracer.close()
+
+    def test_close_flushes_exporter_batch(self, tmp_path):
+        path = tmp_path / 'trace.jsonl'
+        tracer = Tracer(str(path), flush_interval=60)
+        for _ in range(3):
+            with tracer.span('iteration'):
+                pass
+        time.sleep(0.2)
+        tracer.close()
+        assert len(read_spans(path)) == 3, (
+            'Проверьте, что close записывает отрезки, уже взятые'
+            ' фоновым потоком'
+        )
+        assert tracer.exporter is None
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import watchdog
+
+
+class TestWatchdog:
+
+    def test_restart_exits_when_uptime_too_short(self, monkeypatch):
+        monkeypatch.delenv(watchdog.RESTARTS_ENV, raising=False)
+        monkeypatch.setattr(os, 'execv', lambda *args: pytest.fail(
+            'Перезапуск не должен выполняться сразу после старта'
+        ))
+        with pytest.raises(SystemExit):
+            watchdog.restart(max_restarts=5, min_uptime=10 ** 6)
+
+    def test_restart_exits_after_max_restarts(self, monkeypatch):
+        monkeypatch.setenv(watchdog.RESTARTS_ENV, '3')
+        monkeypatch.setattr(watchdog, 'STARTED', -10 ** 6)
+        monkeypatch.setattr(os, 'execv', lambda *args: pytest.fail(
+            'Перезапуск не должен выполняться после лимита перезапусков'
+        ))
+        with pytest.raises(SystemExit):
+            watchdog.restart(max_restarts=3, min_uptime=0)
+
+    def test_restart_counts_restarts(self, monkeypatch):
+        calls = []
+        monkeypatch.setenv(watchdog.RESTARTS_ENV, '1')
+        monkeypatch.setattr(watchdog, 'STARTED', -10 ** 6)
+        monkeypatch.setattr(os, 'execv', lambda *args: calls.append(args))
+        watchdog.restart(max_restarts=3, min_uptime=0)
+        assert calls, 'Проверьте, что бот перезапускается в пределах лимита'
+        assert os.environ[watchdog.RESTARTS_ENV] == '2', (
+            'Проверьте, что счётчик перезапусков передаётся новому процессу'
+        )
+
+    def test_check_skips_limits_without_rss(self, monkeypatch):
+        monkeypatch.setattr(watchdog, 'get_rss', lambda: None)
+        memory_watchdog = watchdog.MemoryWatchdog(0, 0)
+        assert memory_watchdog.check(), (
+            'Без сведений о памяти сторож не должен требовать перезапуска'
+        )
@@ -0,0 +1,196 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+STOP = object()
+
+
+class Span:
+    """Отрезок времени выполнения одного шага бота."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'sampled',
+                 'start', 'end', 'attributes')
+
+    def __init__(self, name, parent=None, sampled=True):
+        """Создание отрезка, дочернего к parent или корневого."""
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = None
+            self.sampled = sampled
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = {}
+
+    def set(self, key, value):
+        """Добавление атрибута отрезка."""
+        self.attributes[key] = value
+
+    def to_dict(self):
+        """Отрезок в виде словаря с именами полей, как в OTLP."""
+        return {
+            'name': self.name,
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id,
+            'startTimeUnixNano': self.start,
+            'endTimeUnixNano': self.end,
+            'attributes': self.attributes,
+        }
+
+
+class Tracer:
+    """Трассировка итераций бота с пакетной выгрузкой в JSONL-файл.
+    Отрезки передаются фоновому потоку через ограниченную очередь:
+    основной цикл никогда не ждёт записи, при переполнении отрезки
+    отбрасываются. Без пути к файлу трассировка отключена
+    """
+
+    def __init__(self, path=None, sample_rate=1.0, batch_size=100,
+                 flush_interval=5, max_queue=1000):
+        """Создание трассировщика с долей сохраняемых итераций."""
+        self.path = path
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.exporter = None
+        self.registered = False
+
+    def current(self):
+        """Текущий отрезок потока или None."""
+        stack = getattr(self.local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def set_attribute(self, key, value):
+        """Добавление атрибута к текущему отрезку, если он есть."""
+        span = self.current()
+        if span is not None:
+            span.set(key, value)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Отрезок вокруг блока кода, вложенный в текущий отрезок потока."""
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        span = Span(name, self.current(),
+                    self.path is not None
+                    and random.random() < self.sample_rate)
+        span.attributes.update(attributes)
+        self.local.stack.append(span)
+        try:
+            yield span
+        except Exception as error:
+            span.set('error', repr(error))
+            raise
+        finally:
+            span.end = time.time_ns()
+            self.local.stack.pop()
+            if span.sampled:
+                self.export(span)
+
+    @contextmanager
+    def attach(self, span):
+        """Продолжение в текущем потоке отрезка span из другого потока.
+        Отрезки, открытые внутри блока, становятся дочерними к span,
+        сам span повторно не выгружается
+        """
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        self.local.stack.append(span)
+        try:
+            yield span
+        finally:
+            self.local.stack.pop()
+
+    def export(self, span):
+        """Неблокирующая передача отрезка фоновому потоку."""
+        with self.lock:
+            if self.exporter is None:
+                self.exporter = threading.Thread(target=self.run,
+                                                 daemon=True)
+                self.exporter.start()
+                if not self.registered:
+                    atexit.register(self.close)
+                    self.registered = True
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        """Цикл фонового потока: накопление пачки и запись в файл.
+        По STOP поток записывает накопленную пачку и завершается
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                span = self.queue.get(
+                    timeout=max(0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                span = None
+            if span is STOP:
+                self.write(batch)
+                return
+            if span is not None:
+                batch.append(span)
+            if (span is None or len(batch) >= self.batch_size
+                    or time.monotonic() >= deadline):
+                self.write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def write(self, batch):
+        """Дозапись пачки отрезков в файл, по строке JSON на отрезок."""
+        if not batch:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.writelines(
+                    json.dumps(span.to_dict(), ensure_ascii=False) + '\n'
+                    for span in batch
+                )
+        except OSError as error:
+            logging.error(f'Ошибка записи трассировки: {error}')
+
+    def close(self, timeout=5):
+        """Остановка фонового потока с записью всех накопленных отрезков.
+        Отрезки, оставшиеся в очереди после остановки потока,
+        записываются в вызывающем потоке
+        """
+        with self.lock:
+            exporter, self.exporter = self.exporter, None
+        if exporter is not None and exporter.is_alive():
+            try:
+                self.queue.put(STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            exporter.join(timeout)
+            if exporter.is_alive():
+                logging.error('Поток трассировки не завершился вовремя')
+                return
+        batch = []
+        while True:
+            try:
+                span = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if span is not STOP:
+                batch.append(span)
+        self.write(batch)
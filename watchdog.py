@@ -0,0 +1,92 @@
+import gc
+import logging
+import os
+import sys
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+STARTED = time.monotonic()
+RESTARTS_ENV = 'BOT_MEMORY_RESTARTS'
+
+
+def get_rss():
+    """Текущий объём резидентной памяти процесса в байтах.
+    Берётся из /proc, без него - из psutil, если он установлен.
+    Возвращает None, если текущий объём узнать нельзя
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+def restart(max_restarts, min_uptime):
+    """Перезапуск процесса бота с теми же аргументами командной строки.
+    Если процесс прожил меньше min_uptime секунд или уже перезапускался
+    max_restarts раз, бот завершается с ошибкой, а перезапуск
+    остаётся супервизору: иначе при базовом потреблении выше лимита
+    бот перезапускался бы на каждой итерации
+    """
+    restarts = int(os.environ.get(RESTARTS_ENV, 0))
+    uptime = time.monotonic() - STARTED
+    if restarts >= max_restarts or uptime < min_uptime:
+        logging.critical(f'Превышен лимит памяти: перезапусков {restarts},'
+                         f' время работы {uptime:.0f} с, завершение бота')
+        logging.shutdown()
+        sys.exit('Превышен лимит памяти')
+    logging.critical('Перезапуск бота из-за превышения лимита памяти')
+    logging.shutdown()
+    os.environ[RESTARTS_ENV] = str(restarts + 1)
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+class MemoryWatchdog:
+    """Контроль потребления памяти между итерациями основного цикла."""
+
+    def __init__(self, soft_limit, hard_limit):
+        """Создание сторожа с мягким и жёстким лимитом памяти в байтах."""
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.compactors = []
+        self.last_objects = 0
+        self.rss_unavailable = False
+
+    def register(self, compactor):
+        """Регистрация функции, сбрасывающей накопленное состояние."""
+        self.compactors.append(compactor)
+
+    def check(self):
+        """Замер памяти и числа объектов после итерации.
+        При превышении мягкого лимита вызывает зарегистрированные
+        функции сжатия и сборщик мусора. Возвращает False, если
+        жёсткий лимит превышен и даже после этого, и нужен перезапуск
+        """
+        rss = get_rss()
+        if rss is None:
+            if not self.rss_unavailable:
+                logging.warning('Объём памяти процесса недоступен,'
+                                ' лимиты памяти не проверяются')
+            self.rss_unavailable = True
+            return True
+        objects = len(gc.get_objects())
+        logging.debug(f'Память: RSS {rss // 1024} КБ,'
+                      f' объектов {objects},'
+                      f' прирост {objects - self.last_objects}')
+        self.last_objects = objects
+        if rss > self.soft_limit:
+            logging.warning(f'Превышен мягкий лимит памяти:'
+                            f' {rss // 1024} КБ, сжатие состояния')
+            for compactor in self.compactors:
+                compactor()
+            gc.collect()
+            rss = get_rss()
+        return rss <= self.hard_limit